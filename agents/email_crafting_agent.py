@@ -1,25 +1,169 @@
 """Email Crafting Agent with improved error handling and type hints."""
 
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Optional
-import google.generativeai as genai
+import os
+import sqlite3
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
 
 from config import config
 
+# Imported lazily on first follow-up draft: initial outreach is pure
+# templating and shouldn't pay the multi-second SDK import at cold start
+genai = None
+
+
+def _load_genai():
+    """Import google.generativeai on demand, caching the module."""
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
+
+# Maximum concurrent Gemini requests, to respect API QPS limits
+MAX_CONCURRENT_DRAFTS = 8
+
+# Client-side response cache: identical prompts (re-runs, retries) skip
+# the Gemini API entirely. Persisted across process restarts.
+RESPONSE_CACHE_PATH = 'database/gemini_cache.sqlite'
+RESPONSE_CACHE_TTL_SECONDS = 24 * 3600
+
+# Explicit context caching requires a 1.5+ model with a pinned version
+CACHED_MODEL_NAME = 'models/gemini-1.5-flash-002'
+CACHE_TTL = timedelta(hours=1)
+
+# Extend the context cache TTL only once it gets this close to expiry;
+# CachedContent.update is its own API round-trip, so refreshing on
+# every draft would double the per-draft call count
+CACHE_REFRESH_MARGIN_SECONDS = 300
+
+# Follow-ups are capped at 60 words, so a tight token budget stops the
+# model from streaming tokens we would discard anyway
+GENERATION_CONFIG = {'max_output_tokens': 120, 'temperature': 0.5}
+
+# Static instruction prelude shared by every follow-up draft. Cached
+# server-side so each call only pays for the per-lead dynamic lines.
+STATIC_COPYWRITER_PROMPT = """You are an expert copywriter specializing in friendly, professional, and non-pushy follow-up emails.
+Your goal is to gently remind the recipient of the previous email without being annoying.
+
+Draft a concise, friendly follow-up email for the lead described by the user.
+
+Instructions:
+1. Keep the entire email under 60 words.
+2. Reference the quality of our work or our showreel.
+3. Gently "bump" the original idea of a potential collaboration.
+4. Do not include a subject line or any introduction like "Here's the draft:". Just provide the raw body text."""
+
+# Initial-email templates rendered once at import: the config-derived
+# portions never change at runtime, so each draft only substitutes the
+# per-lead fields.
+_SUBJECT_TEMPLATE = "A Partnership in Storytelling for {company}"
+
+_BODY_TEMPLATE = f"""Hi {{firstName}},
+
+I'm {config.your_name} from Reason GTMC. We partner with creators and brands like yours to tell powerful stories through cinematic video.
+
+Our team handles every aspect of production, from initial concept and creative strategy to the final cut, using the industry's best equipment to bring ambitious ideas to life. We believe the best work comes from true collaboration, where we serve as the creative and technical engine for your vision. This means we start by diving deep into your brand's objectives to ensure we're perfectly aligned.
+
+Our in-house process covers everything: storyboarding, scripting, on-location shooting, and meticulous post-production, including cinematic editing, color grading, and sound design.
+
+Whether it's a documentary that captures your brand's ethos, a high-energy brand campaign, or a polished podcast series, we build a process around your goals to ensure the final product is both beautiful and impactful.
+
+Here's a glimpse into our style: {config.portfolio_link}
+
+If you're looking for a dedicated partner for your next project, we'd love to schedule a brief call to learn more about your vision.
+
+All the best,
+
+{config.your_name}
+{config.your_title}
+Reason GTM&C"""
+
 
 class EmailCraftingAgent:
     """Agent responsible for crafting personalized emails using templates and LLM."""
     
     def __init__(self):
         """Initialize the Email Crafting Agent."""
+        self.cache = None
+        self.model = None
+        self._model_ready = False
+        self._cache_deadline = 0.0
+        self._response_cache: Dict[str, str] = {}
+        self._cache_db = self._open_response_cache()
+
+    def _ensure_model(self) -> None:
+        """Configure Gemini and build the model on first follow-up draft."""
+        if self._model_ready:
+            return
+        self._model_ready = True
         try:
+            _load_genai()
             genai.configure(api_key=config.google_api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = self._build_model()
             logging.info("Successfully initialized Gemini API")
         except Exception as e:
             logging.error(f"Error configuring Gemini API: {e}")
             self.model = None
 
+    def _build_model(self) -> "genai.GenerativeModel":
+        """
+        Build the Gemini model, preferring a cached system instruction.
+
+        The copywriter prelude is identical for every follow-up, so caching
+        it server-side avoids re-billing those input tokens on each call.
+        Falls back to a plain model when context caching is unavailable.
+
+        Note: the ~80-token copywriter prompt is far below Gemini's
+        minimum cacheable input size (32k tokens for flash models), so
+        in practice create() fails and the plain model is the steady
+        state; the cached path only kicks in if the prelude ever grows
+        past that threshold.
+        """
+        try:
+            self.cache = genai.caching.CachedContent.create(
+                model=CACHED_MODEL_NAME,
+                system_instruction=STATIC_COPYWRITER_PROMPT,
+                ttl=CACHE_TTL,
+            )
+            self._cache_deadline = (
+                time.monotonic()
+                + CACHE_TTL.total_seconds()
+                - CACHE_REFRESH_MARGIN_SECONDS
+            )
+            logging.info("Created Gemini context cache for follow-up prompt")
+            return genai.GenerativeModel.from_cached_content(self.cache)
+        except Exception as e:
+            logging.warning(f"Gemini context caching unavailable, using plain model: {e}")
+            self.cache = None
+            return genai.GenerativeModel(CACHED_MODEL_NAME)
+
+    def _refresh_cache(self) -> None:
+        """
+        Extend the context cache TTL when it is close to expiring.
+
+        Drafts well inside the TTL skip the update round-trip entirely;
+        a cache that expired anyway is rebuilt along with the model.
+        """
+        if not self.cache:
+            return
+        if time.monotonic() < self._cache_deadline:
+            return
+        try:
+            self.cache.update(ttl=CACHE_TTL)
+            self._cache_deadline = (
+                time.monotonic()
+                + CACHE_TTL.total_seconds()
+                - CACHE_REFRESH_MARGIN_SECONDS
+            )
+        except Exception as e:
+            logging.warning(f"Gemini context cache expired, recreating: {e}")
+            self.model = self._build_model()
+
     def draft_initial_email(self, lead: Dict[str, str]) -> Dict[str, str]:
         """
         Draft the initial personalized email using a consistent template.
@@ -31,31 +175,13 @@ class EmailCraftingAgent:
             Dictionary with 'subject' and 'body' keys
         """
         try:
-            subject = f"A Partnership in Storytelling for {lead['company']}"
-            
-            body_template = f"""Hi {lead['firstName']},
-
-I'm {config.your_name} from Reason GTMC. We partner with creators and brands like yours to tell powerful stories through cinematic video.
+            subject = _SUBJECT_TEMPLATE.format(company=lead['company'])
+            body = _BODY_TEMPLATE.format(firstName=lead['firstName'])
 
-Our team handles every aspect of production, from initial concept and creative strategy to the final cut, using the industry's best equipment to bring ambitious ideas to life. We believe the best work comes from true collaboration, where we serve as the creative and technical engine for your vision. This means we start by diving deep into your brand's objectives to ensure we're perfectly aligned.
-
-Our in-house process covers everything: storyboarding, scripting, on-location shooting, and meticulous post-production, including cinematic editing, color grading, and sound design.
-
-Whether it's a documentary that captures your brand's ethos, a high-energy brand campaign, or a polished podcast series, we build a process around your goals to ensure the final product is both beautiful and impactful.
-
-Here's a glimpse into our style: {config.portfolio_link}
-
-If you're looking for a dedicated partner for your next project, we'd love to schedule a brief call to learn more about your vision.
+            logging.info(f"Drafted initial email for {lead['email']}")
+            return {"subject": subject.strip(), "body": body.strip()}
 
-All the best,
 
-{config.your_name}
-{config.your_title}
-Reason GTM&C"""
-            
-            logging.info(f"Drafted initial email for {lead['email']}")
-            return {"subject": subject.strip(), "body": body_template.strip()}
-            
         except KeyError as e:
             logging.error(f"Missing required lead field: {e}")
             return {"subject": "Error", "body": "Error drafting email"}
@@ -63,52 +189,201 @@ Reason GTM&C"""
             logging.error(f"Unexpected error drafting initial email: {e}")
             return {"subject": "Error", "body": "Error drafting email"}
 
+    def _open_response_cache(self) -> Optional[sqlite3.Connection]:
+        """Open (or create) the on-disk response cache database."""
+        try:
+            os.makedirs(os.path.dirname(RESPONSE_CACHE_PATH), exist_ok=True)
+            db = sqlite3.connect(RESPONSE_CACHE_PATH)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, body TEXT, expires_at REAL)"
+            )
+            db.commit()
+            return db
+        except Exception as e:
+            logging.warning(f"Response cache unavailable: {e}")
+            return None
+
+    def _lead_context(self, lead: Dict[str, str]) -> str:
+        """Build the per-lead dynamic lines of the follow-up prompt."""
+        return f"""- Name: {lead['firstName']}
+- Company: {lead['company']}"""
+
+    def _response_cache_key(self, lead: Dict[str, str]) -> str:
+        """Hash the full canonical prompt so the key is stable across modes."""
+        full_prompt = f"{STATIC_COPYWRITER_PROMPT}\n\n{self._lead_context(lead)}"
+        return hashlib.sha1(full_prompt.encode('utf-8')).hexdigest()
+
+    def _get_cached_response(self, lead: Dict[str, str]) -> Optional[str]:
+        """Look up a previously generated follow-up body for this lead."""
+        key = self._response_cache_key(lead)
+
+        body = self._response_cache.get(key)
+        if body is not None:
+            return body
+
+        if not self._cache_db:
+            return None
+
+        try:
+            row = self._cache_db.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > time.time():
+                self._response_cache[key] = row[0]
+                return row[0]
+        except Exception as e:
+            logging.warning(f"Error reading response cache: {e}")
+
+        return None
+
+    def _store_cached_response(self, lead: Dict[str, str], body: str) -> None:
+        """Persist a generated follow-up body for future identical prompts."""
+        key = self._response_cache_key(lead)
+        self._response_cache[key] = body
+
+        if not self._cache_db:
+            return
+
+        try:
+            self._cache_db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, body, time.time() + RESPONSE_CACHE_TTL_SECONDS)
+            )
+            self._cache_db.commit()
+        except Exception as e:
+            logging.warning(f"Error writing response cache: {e}")
+
+    def _build_follow_up_prompt(self, lead: Dict[str, str]) -> str:
+        """
+        Build the Gemini prompt for a follow-up email.
+
+        With an active context cache only the per-lead dynamic lines are
+        sent; the static copywriter instructions live server-side.
+        """
+        lead_context = self._lead_context(lead)
+
+        if self.cache:
+            return lead_context
+
+        return f"{STATIC_COPYWRITER_PROMPT}\n\n{lead_context}"
+
+    def _format_follow_up(self, lead: Dict[str, str], follow_up_body: str) -> Dict[str, str]:
+        """Wrap the generated follow-up body with subject and signature."""
+        subject = f"Re: A Partnership in Storytelling for {lead['company']}"
+
+        full_body = f"""{follow_up_body}
+
+All the best,
+
+{config.your_name}"""
+
+        logging.info(f"Drafted follow-up email for {lead['email']}")
+        return {"subject": subject, "body": full_body.strip()}
+
     def draft_follow_up_email(self, lead: Dict[str, str]) -> Optional[Dict[str, str]]:
         """
         Use Google's Gemini model to draft a concise follow-up email.
-        
+
         Args:
             lead: Dictionary containing lead information
-            
+
         Returns:
             Dictionary with 'subject' and 'body' keys, or None if failed
         """
+        cached_body = self._get_cached_response(lead)
+        if cached_body is not None:
+            logging.debug(f"Response cache hit for {lead['email']}")
+            return self._format_follow_up(lead, cached_body)
+
+        self._ensure_model()
         if not self.model:
             logging.error("Gemini model not initialized. Cannot draft follow-up")
             return None
 
         try:
-            prompt = f"""You are an expert copywriter specializing in friendly, professional, and non-pushy follow-up emails.
-Your goal is to gently remind the recipient of the previous email without being annoying.
+            self._refresh_cache()
+            response = self.model.generate_content(
+                self._build_follow_up_prompt(lead),
+                generation_config=GENERATION_CONFIG
+            )
 
-Draft a concise, friendly follow-up email for the following lead:
-- Name: {lead['firstName']}
-- Company: {lead['company']}
+            if not response or not response.text:
+                logging.error("Empty response from Gemini API")
+                return None
 
-Instructions:
-1. Keep the entire email under 60 words.
-2. Reference the quality of our work or our showreel.
-3. Gently "bump" the original idea of a potential collaboration.
-4. Do not include a subject line or any introduction like "Here's the draft:". Just provide the raw body text."""
+            body = response.text.strip()
+            self._store_cached_response(lead, body)
+            return self._format_follow_up(lead, body)
+
+        except Exception as e:
+            logging.error(f"Error generating follow-up with Gemini: {e}")
+            return None
+
+    async def draft_follow_up_emails_async(
+        self, leads: List[Dict[str, str]]
+    ) -> List[Optional[Dict[str, str]]]:
+        """
+        Draft follow-up emails for multiple leads concurrently.
+
+        Each Gemini call is an independent network round-trip, so fanning them
+        out with asyncio.gather overlaps all drafts into roughly one RTT.
+        Concurrency is bounded by a semaphore to respect Gemini QPS limits.
+
+        Args:
+            leads: List of lead dictionaries
+
+        Returns:
+            List of draft dictionaries (or None for failures), in input order
+        """
+        # Serve response-cache hits first — like the sync path, they need
+        # no model at all, so a failed Gemini init only loses the drafts
+        # that would actually have called the API
+        drafts: List[Optional[Dict[str, str]]] = [None] * len(leads)
+        misses: List[tuple] = []
+        for index, lead in enumerate(leads):
+            cached_body = self._get_cached_response(lead)
+            if cached_body is not None:
+                logging.debug(f"Response cache hit for {lead['email']}")
+                drafts[index] = self._format_follow_up(lead, cached_body)
+            else:
+                misses.append((index, lead))
+
+        if not misses:
+            return drafts
+
+        self._ensure_model()
+        if not self.model:
+            logging.error("Gemini model not initialized. Cannot draft follow-ups")
+            return drafts
+
+        self._refresh_cache()
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_DRAFTS)
+
+        async def _draft_one(lead: Dict[str, str]) -> Optional[Dict[str, str]]:
+            async with semaphore:
+                response = await self.model.generate_content_async(
+                    self._build_follow_up_prompt(lead),
+                    generation_config=GENERATION_CONFIG
+                )
 
-            response = self.model.generate_content(prompt)
-            
             if not response or not response.text:
                 logging.error("Empty response from Gemini API")
                 return None
-                
-            follow_up_body = response.text.strip()
-            subject = f"Re: A Partnership in Storytelling for {lead['company']}"
 
-            full_body = f"""{follow_up_body}
-
-All the best,
+            body = response.text.strip()
+            self._store_cached_response(lead, body)
+            return self._format_follow_up(lead, body)
 
-{config.your_name}"""
+        results = await asyncio.gather(
+            *(_draft_one(lead) for _, lead in misses),
+            return_exceptions=True
+        )
 
-            logging.info(f"Drafted follow-up email for {lead['email']}")
-            return {"subject": subject, "body": full_body.strip()}
+        for (index, lead), result in zip(misses, results):
+            if isinstance(result, Exception):
+                logging.error(f"Error generating follow-up with Gemini for {lead['email']}: {result}")
+            else:
+                drafts[index] = result
 
-        except Exception as e:
-            logging.error(f"Error generating follow-up with Gemini: {e}")
-            return None
+        return drafts
@@ -1,13 +1,22 @@
 """Follow-up Agent with improved error handling and logging."""
 
 import logging
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from email.utils import parseaddr
+from typing import Dict, List, Optional, Set, Tuple
 from googleapiclient.errors import HttpError
 
 from utils.google_api_clients import get_gmail_service
 from config import config
 
+# Gmail's documented limit on sub-requests per batch HTTP call
+BATCH_SIZE = 100
+
+# Addresses OR'd into a single search query; chunked to keep the query
+# string comfortably inside Gmail's search-length limits
+OR_QUERY_CHUNK = 50
+
 
 class FollowUpAgent:
     """Agent responsible for managing follow-up logic and reply detection."""
@@ -20,83 +29,273 @@ class FollowUpAgent:
         if not self.gmail_service:
             logging.error("Failed to initialize Gmail service")
 
-    def check_for_reply(self, lead_email: str, after_timestamp: str) -> bool:
+    def check_for_reply(self, lead_email: str, after_unix: int) -> bool:
         """
         Check for a reply from a specific email address after a given timestamp.
-        
+
         Args:
             lead_email: Email address to check for replies from
-            after_timestamp: ISO 8601 timestamp string to check after
-            
+            after_unix: Unix timestamp (seconds) to check after
+
         Returns:
             True if a reply was found, False otherwise
         """
+        results = self.check_for_replies_bulk([(lead_email, after_unix)])
+        return results.get(lead_email, False)
+
+    def check_for_replies_bulk(self, pairs: List[Tuple[str, int]]) -> Dict[str, bool]:
+        """
+        Check for replies from multiple leads with merged OR'd searches.
+
+        Issues one messages().list per 50 leads using an OR'd from: query
+        anchored at the earliest send time, then resolves the (few)
+        matching messages to their senders with batched metadata gets.
+        API calls scale with replies found, not with leads pending.
+
+        Args:
+            pairs: List of (lead_email, after_unix) tuples, where
+                after_unix is a Unix timestamp in seconds
+
+        Returns:
+            Dictionary mapping lead email to whether a reply was found
+        """
+        results: Dict[str, bool] = {lead_email: False for lead_email, _ in pairs}
+
         if not self.gmail_service:
             logging.error("Gmail service not available for reply checking")
-            return False
-            
+            return results
+
+        if not pairs:
+            return results
+
+        pending_by_lower = {lead_email.lower(): lead_email for lead_email, _ in pairs}
+        after_by_email = {lead_email: after_unix for lead_email, after_unix in pairs}
+
+        message_ids = []
         try:
-            # Convert ISO 8601 string timestamp to Unix timestamp
-            after_dt = datetime.fromisoformat(after_timestamp.replace('Z', '+00:00'))
-            after_unix_ts = int(after_dt.timestamp())
-            
-            # Search for messages from the lead after the timestamp
-            query = f"from:{lead_email} after:{after_unix_ts}"
-            results = self.gmail_service.users().messages().list(
-                userId='me', 
-                q=query
-            ).execute()
-            
-            messages = results.get('messages', [])
-            reply_count = len(messages)
-            
-            if reply_count > 0:
-                logging.info(f"Found {reply_count} reply(s) from {lead_email}")
-                return True
-            else:
-                logging.debug(f"No replies found from {lead_email}")
-                return False
+            for start in range(0, len(pairs), OR_QUERY_CHUNK):
+                chunk = pairs[start:start + OR_QUERY_CHUNK]
+                min_unix = min(after_unix for _, after_unix in chunk)
+                query = (
+                    f"after:{min_unix} from:("
+                    + " OR ".join(lead_email for lead_email, _ in chunk)
+                    + ")"
+                )
+
+                page_token = None
+                while True:
+                    response = self.gmail_service.users().messages().list(
+                        userId='me',
+                        q=query,
+                        pageToken=page_token
+                    ).execute()
+
+                    for message in response.get('messages', []):
+                        message_ids.append(message['id'])
+
+                    page_token = response.get('nextPageToken')
+                    if not page_token:
+                        break
 
-        except ValueError as e:
-            logging.error(f"Invalid timestamp format for {lead_email}: {e}")
-            return False
         except HttpError as e:
-            logging.error(f"HTTP error checking replies from {lead_email}: {e}")
-            return False
+            logging.error(f"HTTP error executing bulk reply check: {e}")
+            return results
         except Exception as e:
-            logging.error(f"Unexpected error checking replies from {lead_email}: {e}")
-            return False
+            logging.error(f"Unexpected error executing bulk reply check: {e}")
+            return results
+
+        if not message_ids:
+            logging.debug("No replies found for any pending lead")
+            return results
+
+        # Map matched messages back to senders, honoring each lead's own
+        # after timestamp since the search anchored at the chunk minimum
+        def _on_get(request_id, response, exception):
+            if exception is not None:
+                logging.error(f"HTTP error fetching message {request_id}: {exception}")
+                return
+            received_unix = int(response.get('internalDate', 0)) // 1000
+            for header in response.get('payload', {}).get('headers', []):
+                if header.get('name', '').lower() == 'from':
+                    sender = parseaddr(header.get('value', ''))[1].lower()
+                    lead_email = pending_by_lower.get(sender)
+                    if lead_email and received_unix >= after_by_email[lead_email]:
+                        results[lead_email] = True
+                    break
+
+        try:
+            for start in range(0, len(message_ids), BATCH_SIZE):
+                batch = self.gmail_service.new_batch_http_request(callback=_on_get)
+                for message_id in message_ids[start:start + BATCH_SIZE]:
+                    batch.add(
+                        self.gmail_service.users().messages().get(
+                            userId='me',
+                            id=message_id,
+                            format='metadata',
+                            metadataHeaders=['From']
+                        ),
+                        request_id=message_id
+                    )
+                batch.execute()
+        except Exception as e:
+            logging.error(f"Unexpected error resolving reply senders: {e}")
+
+        replied = sum(1 for found in results.values() if found)
+        if replied:
+            logging.info(f"Found replies from {replied} lead(s)")
+
+        return results
+
+    def get_current_history_id(self) -> Optional[str]:
+        """Fetch the mailbox's current history ID, for delta checks next run."""
+        if not self.gmail_service:
+            return None
+
+        try:
+            profile = self.gmail_service.users().getProfile(userId='me').execute()
+            history_id = profile.get('historyId')
+            return str(history_id) if history_id else None
+        except HttpError as e:
+            logging.error(f"HTTP error fetching mailbox history ID: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error fetching mailbox history ID: {e}")
+            return None
+
+    def check_replies_via_history(
+        self, start_history_id: str, pending: Set[str]
+    ) -> Tuple[Optional[str], Optional[Set[str]]]:
+        """
+        Detect replies from a mailbox history delta instead of per-lead search.
+
+        One users.history.list call (plus pagination) returns every message
+        added since the last workflow tick, regardless of how many leads are
+        pending — O(1) API calls in the lead count. Senders are resolved via
+        batched metadata gets and matched against the pending set locally.
+
+        Args:
+            start_history_id: History ID recorded at the previous check
+            pending: Set of lead emails awaiting a reply
 
-    def should_send_follow_up(self, initial_email_sent_timestamp: str) -> bool:
+        Returns:
+            Tuple of (new history ID, set of pending emails that replied).
+            Both are None when the delta is unavailable (e.g. the history ID
+            expired) and the caller should fall back to a full check.
+        """
+        if not self.gmail_service:
+            return None, None
+
+        message_ids = []
+        new_history_id = start_history_id
+
+        try:
+            page_token = None
+            while True:
+                result = self.gmail_service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    pageToken=page_token
+                ).execute()
+
+                new_history_id = result.get('historyId', new_history_id)
+                for history in result.get('history', []):
+                    for added in history.get('messagesAdded', []):
+                        message_id = added.get('message', {}).get('id')
+                        if message_id:
+                            message_ids.append(message_id)
+
+                page_token = result.get('nextPageToken')
+                if not page_token:
+                    break
+
+        except HttpError as e:
+            # A 404 means the history ID expired; the caller must re-sync
+            logging.warning(f"History delta unavailable, falling back to full check: {e}")
+            return None, None
+        except Exception as e:
+            logging.error(f"Unexpected error listing mailbox history: {e}")
+            return None, None
+
+        replied: Set[str] = set()
+        pending_by_lower = {email.lower(): email for email in pending}
+
+        if message_ids and pending_by_lower:
+
+            def _on_get(request_id, response, exception):
+                if exception is not None:
+                    logging.error(f"HTTP error fetching message {request_id}: {exception}")
+                    return
+                for header in response.get('payload', {}).get('headers', []):
+                    if header.get('name', '').lower() == 'from':
+                        sender = parseaddr(header.get('value', ''))[1].lower()
+                        if sender in pending_by_lower:
+                            replied.add(pending_by_lower[sender])
+                        break
+
+            try:
+                for start in range(0, len(message_ids), BATCH_SIZE):
+                    batch = self.gmail_service.new_batch_http_request(callback=_on_get)
+                    for message_id in message_ids[start:start + BATCH_SIZE]:
+                        batch.add(
+                            self.gmail_service.users().messages().get(
+                                userId='me',
+                                id=message_id,
+                                format='metadata',
+                                metadataHeaders=['From']
+                            ),
+                            request_id=message_id
+                        )
+                    batch.execute()
+            except Exception as e:
+                logging.error(f"Unexpected error resolving history senders: {e}")
+                return None, None
+
+        if replied:
+            logging.info(f"History delta found replies from {len(replied)} lead(s)")
+
+        return new_history_id, replied
+
+    def prepare_cutoff(self) -> datetime:
+        """
+        Compute the follow-up cutoff once for a workflow tick.
+
+        Leads whose initial email was sent at or before the returned
+        datetime are due for a follow-up. Hoisting this out of the
+        per-lead loop avoids repeated now() calls and timedelta math.
+
+        Returns:
+            The UTC datetime a lead's send time must not exceed
+        """
+        return datetime.now(timezone.utc) - timedelta(hours=self.follow_up_delay)
+
+    def should_send_follow_up(self, sent_unix: int) -> bool:
         """
         Determine if enough time has passed to send a follow-up.
-        
+
         Args:
-            initial_email_sent_timestamp: ISO 8601 timestamp when initial email was sent
-            
+            sent_unix: Unix timestamp (seconds) when the initial email was sent
+
         Returns:
             True if it's time to send a follow-up, False otherwise
         """
         try:
-            sent_time = datetime.fromisoformat(
-                initial_email_sent_timestamp.replace('Z', '+00:00')
-            )
-            current_time = datetime.now(timezone.utc)
-            follow_up_time = sent_time + timedelta(hours=self.follow_up_delay)
-            
-            should_send = current_time >= follow_up_time
-            
+            now = time.time()
+            follow_up_time = sent_unix + self.follow_up_delay * 3600
+
+            should_send = now >= follow_up_time
+
             if should_send:
-                hours_passed = (current_time - sent_time).total_seconds() / 3600
+                hours_passed = (now - sent_unix) / 3600
                 logging.info(f"Follow-up time reached ({hours_passed:.1f} hours passed)")
             else:
-                hours_remaining = (follow_up_time - current_time).total_seconds() / 3600
+                hours_remaining = (follow_up_time - now) / 3600
                 logging.debug(f"Follow-up not due yet ({hours_remaining:.1f} hours remaining)")
-                
+
             return should_send
-            
-        except ValueError as e:
-            logging.error(f"Invalid timestamp format: {e}")
+
+        except TypeError as e:
+            logging.error(f"Invalid timestamp value: {e}")
             return False
         except Exception as e:
             logging.error(f"Error calculating follow-up timing: {e}")
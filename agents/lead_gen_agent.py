@@ -2,12 +2,24 @@
 
 import re
 import logging
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from googleapiclient.errors import HttpError
 
 from utils.google_api_clients import get_sheets_service
 from config import config
 
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Compiled once at import so the per-row hot loop skips the re cache
+# lookup; anchored with \Z rather than $ so a trailing newline can't match
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\Z')
+
+# Column order expected in the lead sheet
+_LEAD_KEYS = ('firstName', 'lastName', 'email', 'company', 'title', 'industry')
+
 
 class LeadGenerationAgent:
     """Agent responsible for fetching and validating leads from Google Sheets."""
@@ -22,9 +34,8 @@ class LeadGenerationAgent:
             logging.error("Failed to initialize Google Sheets service")
 
     def _is_valid_email(self, email: str) -> bool:
-        """Validate email format using regex."""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email.strip()))
+        """Validate email format using the precompiled regex."""
+        return _EMAIL_RE.match(email.strip()) is not None
 
     def _validate_lead(self, row: List[str]) -> Optional[Dict[str, str]]:
         """
@@ -39,79 +50,139 @@ class LeadGenerationAgent:
         if len(row) < config.MIN_ROW_LENGTH:
             logging.warning(f"Insufficient data in row: {row}")
             return None
-        
-        # Clean and validate email
-        email = row[2].strip() if len(row) > 2 else ""
-        if not self._is_valid_email(email):
-            logging.warning(f"Invalid email in row: {email}")
+
+        # One zip over the row replaces six per-field index/strip pairs;
+        # str() covers unformatted cells the API may return as numbers
+        lead = dict(zip(_LEAD_KEYS, (str(cell).strip() for cell in row)))
+
+        if not self._is_valid_email(lead['email']):
+            logging.warning(f"Invalid email in row: {lead['email']}")
             return None
-            
-        # Clean other fields
-        first_name = row[0].strip() if len(row) > 0 else ""
-        last_name = row[1].strip() if len(row) > 1 else ""
-        company = row[3].strip() if len(row) > 3 else ""
-        title = row[4].strip() if len(row) > 4 else ""
-        industry = row[5].strip() if len(row) > 5 else ""
-        
-        # Validate required fields
-        if not all([first_name, email, company]):
+
+        if not all([lead['firstName'], lead['email'], lead['company']]):
             logging.warning(f"Missing required fields in row: {row}")
             return None
-            
-        return {
-            "firstName": first_name,
-            "lastName": last_name,
-            "email": email,
-            "company": company,
-            "title": title,
-            "industry": industry
-        }
 
-    def fetch_leads(self) -> List[Dict[str, str]]:
+        return lead
+
+    def _validate_leads_bulk(self, values: List[List[str]]) -> List[Dict[str, str]]:
         """
-        Fetch and validate lead data from the configured Google Sheet.
-        
+        Validate and clean lead rows in one vectorized pandas pass.
+
+        Moves the per-field strip/regex/required-field work into C
+        extension code instead of the Python row loop — the hot path
+        once sheets reach tens of thousands of rows.
+
+        Args:
+            values: Raw 2D row data from the spreadsheet
+
         Returns:
             List of validated lead dictionaries
         """
+        df = pd.DataFrame(values).reindex(columns=range(len(_LEAD_KEYS))).fillna('')
+        df.columns = list(_LEAD_KEYS)
+        df = df.astype(str).apply(lambda s: s.str.strip())
+
+        long_enough = pd.Series(
+            [len(row) >= config.MIN_ROW_LENGTH for row in values], index=df.index
+        )
+        mask = (
+            long_enough
+            & df['email'].str.match(_EMAIL_RE)
+            & df['firstName'].ne('')
+            & df['company'].ne('')
+        )
+
+        skipped = int((~mask).sum())
+        if skipped:
+            logging.warning(f"Skipped {skipped} invalid rows during bulk validation")
+
+        return df.loc[mask].to_dict('records')
+
+    def _fetch_values(self) -> List[List[str]]:
+        """
+        Fetch the raw 2D row data from the configured Google Sheet.
+
+        Returns:
+            List of raw rows, or an empty list on failure
+        """
         if not self.sheets_service:
             logging.error("Google Sheets service not available")
             return []
-            
+
         try:
             logging.info(f"Fetching leads from sheet: {self.spreadsheet_id}")
-            
+
+            # batchGet folds any number of ranges into one round-trip, so
+            # future status/notes columns can ride along at no extra cost
             sheet = self.sheets_service.spreadsheets()
-            result = sheet.values().get(
+            result = sheet.values().batchGet(
                 spreadsheetId=self.spreadsheet_id,
-                range=self.range_name
+                ranges=[self.range_name],
+                valueRenderOption='UNFORMATTED_VALUE',
+                majorDimension='ROWS',
+                fields='valueRanges(values)'
             ).execute()
-            
-            values = result.get('values', [])
-            
+
+            values = []
+            for value_range in result.get('valueRanges', []):
+                values.extend(value_range.get('values', []))
+
             if not values:
                 logging.warning("No data found in the sheet")
-                return []
 
-            # Validate and clean leads
+            return values
+
+        except HttpError as e:
+            logging.error(f"HTTP error fetching leads: {e}")
+            return []
+        except Exception as e:
+            logging.error(f"Unexpected error fetching leads: {e}")
+            return []
+
+    def iter_leads(self) -> Iterator[Dict[str, str]]:
+        """
+        Yield validated leads one at a time.
+
+        Lets callers process arbitrarily large sheets without a second
+        full-size list of lead dicts in memory; only the raw API response
+        is materialized.
+
+        Yields:
+            Validated lead dictionaries
+        """
+        for i, row in enumerate(self._fetch_values(), start=2):  # A2 is first data row
+            lead = self._validate_lead(row)
+            if lead:
+                yield lead
+            else:
+                logging.warning(f"Skipped invalid row {i}: {row}")
+
+    def fetch_leads(self) -> List[Dict[str, str]]:
+        """
+        Fetch and validate lead data from the configured Google Sheet.
+
+        Returns:
+            List of validated lead dictionaries
+        """
+        values = self._fetch_values()
+        if not values:
+            return []
+
+        total_rows = len(values)
+
+        if pd is not None:
+            leads = self._validate_leads_bulk(values)
+        else:
             leads = []
-            total_rows = len(values)
-            
             for i, row in enumerate(values, start=2):  # Start at 2 since A2 is first data row
                 lead = self._validate_lead(row)
                 if lead:
                     leads.append(lead)
                 else:
                     logging.warning(f"Skipped invalid row {i}: {row}")
-            
-            valid_count = len(leads)
-            logging.info(f"Successfully processed {valid_count}/{total_rows} leads")
-            
-            return leads
 
-        except HttpError as e:
-            logging.error(f"HTTP error fetching leads: {e}")
-            return []
-        except Exception as e:
-            logging.error(f"Unexpected error fetching leads: {e}")
-            return []
+        valid_count = len(leads)
+        logging.info(f"Successfully processed {valid_count}/{total_rows} leads")
+
+        return leads
@@ -1,29 +1,59 @@
 """Orchestrator Agent - Central coordinator for the multi-agent outreach system."""
 
+import asyncio
+import atexit
 import json
 import logging
+import os
+import signal
+import sqlite3
+import sys
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from agents.lead_gen_agent import LeadGenerationAgent
 from agents.email_crafting_agent import EmailCraftingAgent
 from agents.sending_agent import SendingAgent
 from agents.follow_up_agent import FollowUpAgent
-from utils.bigquery_client import bq_client
+from utils.bigquery_client import get_bq_client
+
+# Columns of the SQLite lead-status table, in schema order
+_STATE_COLUMNS = (
+    'status',
+    'initial_sent_timestamp',
+    'initial_sent_unix',
+    'follow_up_sent_timestamp',
+    'replied_timestamp',
+)
 
 
 class OrchestratorAgent:
     """Central orchestrator that coordinates workflow between specialized agents."""
     
-    def __init__(self, state_file: str = 'database/lead_status.json'):
+    def __init__(self, state_db: str = 'database/lead_status.db',
+                 state_file: str = 'database/lead_status.json'):
         """
         Initialize the Orchestrator Agent.
-        
+
         Args:
-            state_file: Path to the JSON file for persisting lead status
+            state_db: Path to the SQLite database persisting lead status
+            state_file: Path to the legacy JSON snapshot (migrated on first
+                run, then kept as a human-readable export)
         """
+        self.state_db = state_db
         self.state_file = state_file
+        self._db = self._open_state_db()
         self.lead_status = self._load_state()
+        self._leads_by_email: Dict[str, Dict[str, str]] = {}
+        self._pending_bq_events: List[tuple] = []
+
+        self._register_signal_handlers()
+        atexit.register(self._flush_state)
 
         # Initialize all subordinate agents
         logging.info("Initializing subordinate agents...")
@@ -33,33 +63,209 @@ class OrchestratorAgent:
         self.follow_up_agent = FollowUpAgent()
         logging.info("All agents initialized successfully")
 
+    def _open_state_db(self) -> Optional[sqlite3.Connection]:
+        """Open (or create) the SQLite lead-status store in WAL mode."""
+        try:
+            os.makedirs(os.path.dirname(self.state_db), exist_ok=True)
+            db = sqlite3.connect(self.state_db, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS leads('
+                'email TEXT PRIMARY KEY, '
+                'status TEXT, '
+                'initial_sent_timestamp TEXT, '
+                'initial_sent_unix INTEGER, '
+                'follow_up_sent_timestamp TEXT, '
+                'replied_timestamp TEXT)'
+            )
+            # The follow-up phase scans by status, so keep it indexed
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(status)'
+            )
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT)'
+            )
+            return db
+        except Exception as e:
+            logging.error(f"Error opening state database: {e}")
+            return None
+
     def _load_state(self) -> Dict[str, Any]:
         """
-        Load the current state from the JSON file.
-        
+        Load the current state from SQLite.
+
+        Migrates any legacy lead_status.json snapshot into the database
+        the first time the table is empty.
+
         Returns:
             Dictionary containing lead status data
         """
+        state: Dict[str, Any] = {}
+
+        if self._db is None:
+            return state
+
+        try:
+            rows = self._db.execute(
+                f"SELECT email, {', '.join(_STATE_COLUMNS)} FROM leads"
+            ).fetchall()
+
+            if not rows:
+                self._migrate_legacy_state()
+                rows = self._db.execute(
+                    f"SELECT email, {', '.join(_STATE_COLUMNS)} FROM leads"
+                ).fetchall()
+
+            for row in rows:
+                email, values = row[0], row[1:]
+                state[email] = {
+                    column: value
+                    for column, value in zip(_STATE_COLUMNS, values)
+                    if value is not None
+                }
+
+            # Backfill the Unix send time for records written before it
+            # existed, so the follow-up loop never re-parses ISO strings
+            for email, record in state.items():
+                if 'initial_sent_unix' in record:
+                    continue
+                sent_iso = record.get('initial_sent_timestamp')
+                if not sent_iso:
+                    continue
+                try:
+                    sent_unix = int(
+                        datetime.fromisoformat(
+                            sent_iso.replace('Z', '+00:00')
+                        ).timestamp()
+                    )
+                except ValueError:
+                    continue
+                record['initial_sent_unix'] = sent_unix
+                self._db.execute(
+                    'UPDATE leads SET initial_sent_unix = ? WHERE email = ?',
+                    (sent_unix, email)
+                )
+
+            logging.info(f"Loaded state for {len(state)} leads")
+        except Exception as e:
+            logging.error(f"Error loading state: {e}")
+
+        return state
+
+    def _migrate_legacy_state(self) -> None:
+        """Import the legacy JSON snapshot into SQLite, if one exists."""
         try:
             with open(self.state_file, 'r') as f:
-                state = json.load(f)
-                logging.info(f"Loaded state for {len(state)} leads")
-                return state
+                legacy = json.load(f)
         except FileNotFoundError:
-            logging.info("No existing state file found, starting fresh")
-            return {}
-        except json.JSONDecodeError as e:
-            logging.error(f"Invalid JSON in state file: {e}")
-            return {}
+            return
+        except (json.JSONDecodeError, Exception) as e:
+            logging.error(f"Error reading legacy state file: {e}")
+            return
+
+        for email, record in legacy.items():
+            self._db.execute(
+                f"INSERT OR REPLACE INTO leads(email, {', '.join(_STATE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(_STATE_COLUMNS))})",
+                (email, *[record.get(column) for column in _STATE_COLUMNS])
+            )
+        logging.info(f"Migrated {len(legacy)} leads from legacy JSON state")
+
+    def _upsert_lead_row(self, email: str) -> None:
+        """Write one lead's current record to SQLite — a single-row upsert."""
+        if self._db is None:
+            return
+
+        record = self.lead_status[email]
+        try:
+            self._db.execute(
+                f"INSERT INTO leads(email, {', '.join(_STATE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(_STATE_COLUMNS))}) "
+                "ON CONFLICT(email) DO UPDATE SET "
+                + ', '.join(f"{column}=excluded.{column}" for column in _STATE_COLUMNS),
+                (email, *[record.get(column) for column in _STATE_COLUMNS])
+            )
         except Exception as e:
-            logging.error(f"Error loading state: {e}")
-            return {}
+            logging.error(f"Error writing state for {email}: {e}")
+
+    def _register_signal_handlers(self) -> None:
+        """Flush coalesced state on SIGTERM/SIGINT so kills don't lose progress."""
+
+        def _handle_shutdown(signum, frame):
+            logging.warning(f"Received signal {signum}, flushing state before exit")
+            self._flush_state()
+            self._save_state()
+            sys.exit(1)
+
+        try:
+            signal.signal(signal.SIGTERM, _handle_shutdown)
+            signal.signal(signal.SIGINT, _handle_shutdown)
+        except ValueError:
+            # Not in the main thread; rely on the workflow's finally block
+            pass
+
+    def _begin_state_batch(self) -> None:
+        """
+        Start coalescing status upserts into one transaction.
+
+        The per-update upserts stay O(1), but grouping a whole workflow
+        phase into a single commit reduces fsyncs from one per lead to
+        one per phase.
+        """
+        if self._db is None:
+            return
+        try:
+            self._db.execute('BEGIN')
+        except sqlite3.OperationalError:
+            pass  # Already in a transaction
+
+    def _flush_state(self) -> None:
+        """Commit any coalesced status upserts to disk."""
+        if self._db is None:
+            return
+        try:
+            if self._db.in_transaction:
+                self._db.execute('COMMIT')
+        except Exception as e:
+            logging.error(f"Error flushing state: {e}")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        """Read one value from the workflow metadata table."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                'SELECT value FROM meta WHERE key = ?', (key,)
+            ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Error reading meta key {key}: {e}")
+            return None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        """Write one value to the workflow metadata table."""
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                'INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)', (key, value)
+            )
+        except Exception as e:
+            logging.error(f"Error writing meta key {key}: {e}")
 
     def _save_state(self) -> None:
-        """Save the current state to the JSON file."""
+        """Write a JSON export of the current state.
+
+        The file is machine-read only, so it is written compactly; orjson
+        is used when installed for its much faster native encoder.
+        """
         try:
-            with open(self.state_file, 'w') as f:
-                json.dump(self.lead_status, f, indent=4, default=str)
+            if orjson is not None:
+                with open(self.state_file, 'wb') as f:
+                    f.write(orjson.dumps(self.lead_status, option=orjson.OPT_SORT_KEYS))
+            else:
+                with open(self.state_file, 'w') as f:
+                    json.dump(self.lead_status, f, separators=(',', ':'), default=str)
             logging.debug("State saved successfully")
         except Exception as e:
             logging.error(f"Error saving state: {e}")
@@ -81,27 +287,41 @@ class OrchestratorAgent:
         # Add specific timestamps based on status
         if status == 'INITIAL_EMAIL_SENT':
             self.lead_status[email]['initial_sent_timestamp'] = timestamp
+            # Store the Unix form alongside so hot loops skip ISO parsing
+            if timestamp:
+                self.lead_status[email]['initial_sent_unix'] = int(
+                    datetime.fromisoformat(timestamp).timestamp()
+                )
         elif status == 'FOLLOW_UP_SENT':
             self.lead_status[email]['follow_up_sent_timestamp'] = timestamp
         elif status == 'REPLIED':
             self.lead_status[email]['replied_timestamp'] = timestamp
-            
-        self._save_state()
+
+        self._upsert_lead_row(email)
         
-        # Update BigQuery
+        # Update BigQuery; events are buffered and flushed once per phase
+        bq_client = get_bq_client()
         if bq_client.client:
             bq_client.update_lead_status(email, status)
-            
-            # Insert email event
+
             if status == 'INITIAL_EMAIL_SENT':
-                bq_client.insert_email_event(email, 'INITIAL_SENT')
+                self._pending_bq_events.append((email, 'INITIAL_SENT'))
             elif status == 'FOLLOW_UP_SENT':
-                bq_client.insert_email_event(email, 'FOLLOW_UP_SENT')
+                self._pending_bq_events.append((email, 'FOLLOW_UP_SENT'))
             elif status == 'REPLIED':
-                bq_client.insert_email_event(email, 'REPLIED')
-        
+                self._pending_bq_events.append((email, 'REPLIED'))
+
         logging.info(f"Updated status for {email} to {status}")
 
+    def _flush_bq_events(self) -> None:
+        """Send all buffered email events to BigQuery in one batched insert."""
+        if not self._pending_bq_events:
+            return
+        bq_client = get_bq_client()
+        if bq_client.client:
+            bq_client.insert_email_events_bulk(self._pending_bq_events)
+        self._pending_bq_events = []
+
     def _process_new_leads(self, all_leads: List[Dict[str, str]]) -> None:
         """
         Process initial outreach for new leads.
@@ -109,37 +329,38 @@ class OrchestratorAgent:
         Args:
             all_leads: List of all lead data
         """
-        new_leads_count = 0
-        
+        # Draft all pending emails first so sends can go out in one batch
+        pending_messages = []
+
         for lead in all_leads:
             email = lead['email']
             status = self.lead_status.get(email, {}).get('status', 'PENDING')
 
             if status == 'PENDING':
                 logging.info(f"Processing new lead: {email}")
-                new_leads_count += 1
-                
-                # Draft email
+
                 draft = self.email_crafting_agent.draft_initial_email(lead)
-                
+
                 if draft and draft.get('subject') and draft.get('body'):
-                    # Send email
-                    success = self.sending_agent.send_email(
-                        email, draft['subject'], draft['body']
-                    )
-                    
-                    # Update status
-                    if success:
-                        sent_timestamp = datetime.now(timezone.utc).isoformat()
-                        self._update_lead_status(email, 'INITIAL_EMAIL_SENT', timestamp=sent_timestamp)
-                    else:
-                        logging.error(f"Failed to send initial email to {email}")
+                    pending_messages.append((email, draft['subject'], draft['body']))
                 else:
                     logging.error(f"Failed to draft initial email for {email}")
             else:
                 logging.debug(f"Skipping lead {email} with status: {status}")
-        
-        logging.info(f"Processed {new_leads_count} new leads for initial outreach")
+
+        # Send all drafted emails in batched API calls
+        send_results = self.sending_agent.send_emails_batch(pending_messages)
+
+        # One timestamp for the whole phase: sends left in a single batch,
+        # so per-lead now() calls only add noise to the analytics
+        tick = datetime.now(timezone.utc).isoformat()
+        for email, success in send_results.items():
+            if success:
+                self._update_lead_status(email, 'INITIAL_EMAIL_SENT', timestamp=tick)
+            else:
+                logging.error(f"Failed to send initial email to {email}")
+
+        logging.info(f"Processed {len(pending_messages)} new leads for initial outreach")
 
     def _process_follow_ups(self, all_leads: List[Dict[str, str]]) -> None:
         """
@@ -148,56 +369,111 @@ class OrchestratorAgent:
         Args:
             all_leads: List of all lead data
         """
+        # Build the O(1) email lookup from the leads we were handed, so
+        # the method works for any caller rather than silently relying
+        # on run_workflow having populated the index beforehand
+        self._leads_by_email = {lead['email']: lead for lead in all_leads}
+
         follow_up_count = 0
         reply_count = 0
-        
+
+        # Collect all eligible leads upfront so replies can be checked in one batch
+        pending_checks = []
         for email, data in list(self.lead_status.items()):
             if data.get('status') != 'INITIAL_EMAIL_SENT':
                 continue
-                
+
+            # Prefer the stored Unix timestamp; fall back to parsing the
+            # ISO string once for records written before it existed
+            sent_unix = data.get('initial_sent_unix')
+            if sent_unix is None:
+                initial_sent_time = data.get('initial_sent_timestamp')
+                if not initial_sent_time:
+                    logging.warning(f"Missing initial_sent_timestamp for {email}")
+                    continue
+                try:
+                    sent_unix = int(
+                        datetime.fromisoformat(
+                            initial_sent_time.replace('Z', '+00:00')
+                        ).timestamp()
+                    )
+                except ValueError as e:
+                    logging.error(f"Invalid timestamp format for {email}: {e}")
+                    continue
+
+            pending_checks.append((email, sent_unix))
+
+        # Prefer the O(1) history delta for reply detection; fall back to
+        # the batched per-lead search when no (or an expired) history ID
+        # is on record, then re-anchor for the next run
+        reply_results = None
+        last_history_id = self._get_meta('last_history_id')
+        if last_history_id:
+            new_history_id, replied = self.follow_up_agent.check_replies_via_history(
+                last_history_id, {email for email, _ in pending_checks}
+            )
+            if replied is not None:
+                reply_results = {email: email in replied for email, _ in pending_checks}
+                if new_history_id:
+                    self._set_meta('last_history_id', new_history_id)
+
+        if reply_results is None:
+            reply_results = self.follow_up_agent.check_for_replies_bulk(pending_checks)
+            current_history_id = self.follow_up_agent.get_current_history_id()
+            if current_history_id:
+                self._set_meta('last_history_id', current_history_id)
+
+        # Mark replies and collect the leads that are due for a follow-up;
+        # the cutoff is computed once rather than per lead
+        cutoff_unix = int(self.follow_up_agent.prepare_cutoff().timestamp())
+        tick = datetime.now(timezone.utc).isoformat()
+        leads_to_draft = []
+        for email, sent_unix in pending_checks:
             logging.debug(f"Checking status for {email}")
-            
-            # Check for reply
-            initial_sent_time = data.get('initial_sent_timestamp')
-            if not initial_sent_time:
-                logging.warning(f"Missing initial_sent_timestamp for {email}")
-                continue
-                
-            if self.follow_up_agent.check_for_reply(email, initial_sent_time):
-                self._update_lead_status(
-                    email, 'REPLIED', 
-                    timestamp=datetime.now(timezone.utc).isoformat()
-                )
+
+            if reply_results.get(email, False):
+                self._update_lead_status(email, 'REPLIED', timestamp=tick)
                 reply_count += 1
                 continue  # Stop processing this lead
-            
+
             # Check if it's time to send a follow-up
-            if self.follow_up_agent.should_send_follow_up(initial_sent_time):
+            if sent_unix <= cutoff_unix:
                 logging.info(f"Time to send follow-up to {email}")
-                
+
                 # Find the full lead data
-                lead_data = next((l for l in all_leads if l['email'] == email), None)
+                lead_data = self._leads_by_email.get(email)
                 if not lead_data:
                     logging.error(f"Could not find lead data for {email} to send follow-up")
                     continue
-                    
-                # Draft and send follow-up
-                follow_up_draft = self.email_crafting_agent.draft_follow_up_email(lead_data)
-                if follow_up_draft and follow_up_draft.get('subject') and follow_up_draft.get('body'):
-                    success = self.sending_agent.send_email(
-                        email, follow_up_draft['subject'], follow_up_draft['body']
+
+                leads_to_draft.append(lead_data)
+
+        # Draft all follow-ups concurrently, then send them in one batch
+        follow_up_messages = []
+        if leads_to_draft:
+            drafts = asyncio.run(
+                self.email_crafting_agent.draft_follow_up_emails_async(leads_to_draft)
+            )
+            for lead_data, draft in zip(leads_to_draft, drafts):
+                if draft and draft.get('subject') and draft.get('body'):
+                    follow_up_messages.append(
+                        (lead_data['email'], draft['subject'], draft['body'])
                     )
-                    if success:
-                        self._update_lead_status(
-                            email, 'FOLLOW_UP_SENT',
-                            timestamp=datetime.now(timezone.utc).isoformat()
-                        )
-                        follow_up_count += 1
-                    else:
-                        logging.error(f"Failed to send follow-up to {email}")
                 else:
-                    logging.error(f"Failed to draft follow-up for {email}")
-        
+                    logging.error(f"Failed to draft follow-up for {lead_data['email']}")
+
+        send_results = self.sending_agent.send_emails_batch(follow_up_messages)
+
+        # Re-bind after the drafting/sending batch so send times aren't
+        # skewed by however long Gemini took
+        tick = datetime.now(timezone.utc).isoformat()
+        for email, success in send_results.items():
+            if success:
+                self._update_lead_status(email, 'FOLLOW_UP_SENT', timestamp=tick)
+                follow_up_count += 1
+            else:
+                logging.error(f"Failed to send follow-up to {email}")
+
         logging.info(f"Processed follow-ups: {follow_up_count} sent, {reply_count} replies detected")
 
     def run_workflow(self) -> None:
@@ -213,20 +489,29 @@ class OrchestratorAgent:
                 logging.warning("No leads fetched. Exiting workflow")
                 return
 
-            # Store leads in BigQuery
+            # Store leads in BigQuery with one batched insert
+            bq_client = get_bq_client()
             if bq_client.client:
+                leads_with_status = []
                 for lead in all_leads:
                     lead_with_status = lead.copy()
                     lead_with_status['status'] = self.lead_status.get(lead['email'], {}).get('status', 'PENDING')
-                    bq_client.insert_lead(lead_with_status)
+                    leads_with_status.append(lead_with_status)
+                bq_client.insert_leads_bulk(leads_with_status)
 
             # 2. Process Initial Outreach for new leads
             logging.info("Processing initial outreach for new leads...")
+            self._begin_state_batch()
             self._process_new_leads(all_leads)
-            
+            self._flush_state()
+            self._flush_bq_events()
+
             # 3. Process Follow-ups and check for replies
             logging.info("Processing follow-ups and checking for replies...")
+            self._begin_state_batch()
             self._process_follow_ups(all_leads)
+            self._flush_state()
+            self._flush_bq_events()
             
             # 4. Generate and log analytics
             if bq_client.client:
@@ -247,5 +532,7 @@ class OrchestratorAgent:
             logging.error(f"Workflow failed with error: {e}")
             raise
         finally:
-            # Always save final state
+            # Always flush coalesced writes, buffered events, and final state
+            self._flush_state()
+            self._flush_bq_events()
             self._save_state()
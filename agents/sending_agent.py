@@ -2,17 +2,20 @@
 
 import base64
 import logging
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from email.mime.text import MIMEText
 from googleapiclient.errors import HttpError
 
 from utils.google_api_clients import get_gmail_service
 from config import config
 
+# Gmail's documented limit on sub-requests per batch HTTP call
+BATCH_SIZE = 100
+
 
 class SendingAgent:
     """Agent responsible for sending emails via Gmail API."""
-    
+
     def __init__(self):
         """Initialize the Sending Agent."""
         self.gmail_service = get_gmail_service()
@@ -21,6 +24,42 @@ class SendingAgent:
         if not self.gmail_service:
             logging.error("Failed to initialize Gmail service")
 
+    def _build_raw_message(self, recipient_email: str, subject: str, body: str) -> str:
+        """
+        Build the base64url-encoded RFC 5322 message for a plaintext email.
+
+        The common all-ASCII-header case is a single bytes join, skipping
+        the MIME policy/tree machinery entirely; headers with non-ASCII
+        characters fall back to MIMEText for RFC 2047 encoding.
+
+        Args:
+            recipient_email: Email address of the recipient
+            subject: Email subject line
+            body: Email body content
+
+        Returns:
+            The base64url-encoded raw message string
+        """
+        try:
+            raw = b"\r\n".join([
+                b"To: " + recipient_email.encode('ascii'),
+                b"From: " + self.sender_email.encode('ascii'),
+                b"Subject: " + subject.encode('ascii'),
+                b"MIME-Version: 1.0",
+                b"Content-Type: text/plain; charset=utf-8",
+                b"Content-Transfer-Encoding: 8bit",
+                b"",
+                body.encode('utf-8'),
+            ])
+        except UnicodeEncodeError:
+            message = MIMEText(body)
+            message['to'] = recipient_email
+            message['from'] = self.sender_email
+            message['subject'] = subject
+            raw = message.as_bytes()
+
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
     def send_email(self, recipient_email: str, subject: str, body: str) -> bool:
         """
         Send an email using the Gmail API.
@@ -42,16 +81,10 @@ class SendingAgent:
             return False
             
         try:
-            # Create the email message
-            message = MIMEText(body)
-            message['to'] = recipient_email
-            message['from'] = self.sender_email
-            message['subject'] = subject
+            # Build and encode the email message
+            email_body = {'raw': self._build_raw_message(recipient_email, subject, body)}
+
 
-            # Encode the message
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
-            email_body = {'raw': raw_message}
-            
             # Send the email
             result = self.gmail_service.users().messages().send(
                 userId='me', 
@@ -68,3 +101,82 @@ class SendingAgent:
         except Exception as e:
             logging.error(f"Unexpected error sending email to {recipient_email}: {e}")
             return False
+
+    def send_emails_batch(self, messages: List[Tuple[str, str, str]]) -> Dict[str, bool]:
+        """
+        Send multiple emails in batched HTTP requests.
+
+        Packs up to 100 sends into each HTTP round-trip via Gmail's
+        BatchHttpRequest, instead of one round-trip per recipient.
+
+        Args:
+            messages: List of (recipient_email, subject, body) tuples
+
+        Returns:
+            Dictionary mapping recipient email to send success (True/False)
+        """
+        results: Dict[str, bool] = {}
+
+        if not self.gmail_service:
+            logging.error("Gmail service is not available. Cannot send emails")
+            return {recipient: False for recipient, _, _ in messages}
+
+        if not messages:
+            return results
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                logging.error(f"HTTP error sending email to {request_id}: {exception}")
+                results[request_id] = False
+            else:
+                message_id = response.get('id') if response else None
+                logging.info(f"Email successfully sent to {request_id} (ID: {message_id})")
+                results[request_id] = True
+
+        # batch.add raises KeyError on a duplicate request_id, which would
+        # abort the whole chunk — and results are keyed by recipient
+        # anyway — so collapse repeat recipients (e.g. duplicate sheet
+        # rows) to their first message before batching
+        seen = set()
+        unique_messages = []
+        for message in messages:
+            recipient_email = message[0]
+            if recipient_email in seen:
+                logging.warning(f"Skipping duplicate message for {recipient_email}")
+                continue
+            seen.add(recipient_email)
+            unique_messages.append(message)
+
+        try:
+            # Chunk into groups of 100 (Gmail's batch limit)
+            for start in range(0, len(unique_messages), BATCH_SIZE):
+                batch = self.gmail_service.new_batch_http_request(callback=_callback)
+
+                for recipient_email, subject, body in unique_messages[start:start + BATCH_SIZE]:
+                    if not all([recipient_email, subject, body]):
+                        logging.error("Missing required email parameters")
+                        results[recipient_email] = False
+                        continue
+
+                    email_body = {'raw': self._build_raw_message(recipient_email, subject, body)}
+
+                    batch.add(
+                        self.gmail_service.users().messages().send(
+                            userId='me',
+                            body=email_body
+                        ),
+                        request_id=recipient_email
+                    )
+
+                batch.execute()
+
+        except HttpError as e:
+            logging.error(f"HTTP error executing batch send: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error executing batch send: {e}")
+
+        # Any message that never reached a callback counts as a failure
+        for recipient_email, _, _ in messages:
+            results.setdefault(recipient_email, False)
+
+        return results
@@ -10,7 +10,68 @@ from datetime import datetime, timedelta
 # Add the project root to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils.bigquery_client import bq_client
+from utils.bigquery_client import get_bq_client
+
+# The dashboard always talks to BigQuery, so construct the shared
+# client up front; read_only skips the dataset/table creation probes
+# since the dashboard never writes
+bq_client = get_bq_client(read_only=True)
+
+
+def _query_rows(query, max_results=1000):
+    """
+    Run one query, preferring the jobs.query fast path.
+
+    query_and_wait (google-cloud-bigquery >= 3.14) returns small result
+    sets inline on the submission response, skipping the separate
+    jobs.insert + getQueryResults round-trips. Older clients fall back
+    to the classic query().result() pair.
+    """
+    if hasattr(bq_client.client, 'query_and_wait'):
+        return list(bq_client.client.query_and_wait(query, max_results=max_results))
+    return list(bq_client.client.query(query).result())
+
+
+def _run_queries(queries):
+    """
+    Run several SELECT statements as one multi-statement script.
+
+    BigQuery plans and submits a single job, so the client pays one
+    round-trip instead of one per statement. Falls back to sequential
+    queries if the script path fails.
+
+    Args:
+        queries: List of SQL SELECT strings
+
+    Returns:
+        List of row lists, one per input query, in input order
+    """
+    try:
+        script = ";\n".join(queries)
+        job = bq_client.client.query(script)
+        job.result()  # Wait for the whole script
+
+        child_jobs = sorted(
+            bq_client.client.list_jobs(parent_job=job.job_id),
+            key=lambda child: child.created
+        )
+        results = [
+            list(bq_client.client.list_rows(child.destination))
+            for child in child_jobs
+        ]
+        if len(results) == len(queries):
+            return results
+    except Exception as e:
+        print(f"⚠️  Multi-statement query failed, running individually: {e}")
+
+    results = []
+    for query in queries:
+        try:
+            results.append(_query_rows(query))
+        except Exception as e:
+            print(f"⚠️  Query failed: {e}")
+            results.append([])
+    return results
 
 
 def display_dashboard():
@@ -34,29 +95,21 @@ def display_dashboard():
         print(f"Replies Received: {analytics.get('replies_received', 0)}")
         print(f"Response Rate: {analytics.get('response_rate_percent', 0):.2f}%")
         
-        # Lead status breakdown
-        query = f"""
-        SELECT 
+        # Lead status breakdown; ROLLUP emits the grand total as an extra
+        # NULL-status row in the same scan, so no window function (and no
+        # second aggregation pass) is needed for percentages
+        status_query = f"""
+        SELECT
             status,
-            COUNT(*) as count,
-            ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER(), 2) as percentage
+            COUNT(*) as count
         FROM `{bq_client.project_id}.{bq_client.dataset_id}.leads`
-        GROUP BY status
+        GROUP BY ROLLUP(status)
         ORDER BY count DESC
         """
-        
-        job = bq_client.client.query(query)
-        results = list(job.result())
-        
-        if results:
-            print("\n📊 LEAD STATUS BREAKDOWN")
-            print("-" * 30)
-            for row in results:
-                print(f"{row.status}: {row.count} ({row.percentage}%)")
-        
+
         # Email events timeline (last 7 days)
-        query = f"""
-        SELECT 
+        timeline_query = f"""
+        SELECT
             DATE(timestamp) as date,
             event_type,
             COUNT(*) as count
@@ -65,23 +118,25 @@ def display_dashboard():
         GROUP BY date, event_type
         ORDER BY date DESC, event_type
         """
-        
-        job = bq_client.client.query(query)
-        results = list(job.result())
-        
-        if results:
-            print("\n📅 EMAIL ACTIVITY (LAST 7 DAYS)")
-            print("-" * 40)
-            current_date = None
-            for row in results:
-                if row.date != current_date:
-                    current_date = row.date
-                    print(f"\n{row.date}:")
-                print(f"  {row.event_type}: {row.count}")
-        
-        # Top performing industries
-        query = f"""
-        SELECT 
+
+        # Top performing industries, served from the pre-aggregated
+        # materialized view so BQ reads a few rows instead of re-joining
+        # the full email_events table
+        industry_query = f"""
+        SELECT
+            industry,
+            total_leads,
+            replies,
+            SAFE_DIVIDE(replies, sent) * 100 as response_rate
+        FROM `{bq_client.project_id}.{bq_client.dataset_id}.mv_industry_stats`
+        WHERE sent > 0
+        ORDER BY response_rate DESC
+        LIMIT 10
+        """
+
+        # Live JOIN fallback for deployments without the materialized view
+        industry_fallback_query = f"""
+        SELECT
             l.industry,
             COUNT(*) as total_leads,
             COUNT(CASE WHEN e.event_type = 'REPLIED' THEN 1 END) as replies,
@@ -90,7 +145,7 @@ def display_dashboard():
                 COUNT(CASE WHEN e.event_type = 'INITIAL_SENT' THEN 1 END)
             ) * 100 as response_rate
         FROM `{bq_client.project_id}.{bq_client.dataset_id}.leads` l
-        LEFT JOIN `{bq_client.project_id}.{bq_client.dataset_id}.email_events` e 
+        LEFT JOIN `{bq_client.project_id}.{bq_client.dataset_id}.email_events` e
             ON l.email = e.lead_email
         WHERE l.industry IS NOT NULL AND l.industry != ''
         GROUP BY l.industry
@@ -98,10 +153,37 @@ def display_dashboard():
         ORDER BY response_rate DESC
         LIMIT 10
         """
+
+        # One job submission for all three sections
+        status_rows, timeline_rows, industry_rows = _run_queries(
+            [status_query, timeline_query, industry_query]
+        )
+        if not industry_rows:
+            industry_rows = _query_rows(industry_fallback_query)
+
+        results = status_rows
+        if results:
+            print("\n📊 LEAD STATUS BREAKDOWN")
+            print("-" * 30)
+            total = next((row.count for row in results if row.status is None), 0)
+            for row in results:
+                if row.status is None:
+                    continue  # The ROLLUP total row
+                percentage = round(row.count * 100.0 / total, 2) if total else 0
+                print(f"{row.status}: {row.count} ({percentage}%)")
         
-        job = bq_client.client.query(query)
-        results = list(job.result())
+        results = timeline_rows
+        if results:
+            print("\n📅 EMAIL ACTIVITY (LAST 7 DAYS)")
+            print("-" * 40)
+            current_date = None
+            for row in results:
+                if row.date != current_date:
+                    current_date = row.date
+                    print(f"\n{row.date}:")
+                print(f"  {row.event_type}: {row.count}")
         
+        results = industry_rows
         if results:
             print("\n🏭 INDUSTRY PERFORMANCE")
             print("-" * 40)
@@ -121,15 +203,53 @@ def display_dashboard():
         print(f"❌ Error generating dashboard: {e}")
 
 
+def _stream_query_to_csv(query, filename):
+    """
+    Stream query results straight to CSV in Arrow record batches.
+
+    Uses the BigQuery Storage API's columnar gRPC path and writes one
+    chunk at a time, so peak memory is O(batch) instead of O(rows) and
+    the paginated REST JSON decode is skipped entirely.
+
+    Returns:
+        True if the export completed, False if the streaming path is
+        unavailable (caller should fall back to pandas)
+    """
+    try:
+        from google.cloud import bigquery_storage
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return False
+
+    try:
+        bqstorage_client = bigquery_storage.BigQueryReadClient()
+        result = bq_client.client.query(query).result()
+
+        writer = None
+        for batch in result.to_arrow_iterable(bqstorage_client=bqstorage_client):
+            if writer is None:
+                writer = pa_csv.CSVWriter(filename, batch.schema)
+            writer.write_batch(batch)
+
+        if writer is None:
+            return False  # Empty result; let pandas write the header row
+        writer.close()
+        return True
+
+    except Exception as e:
+        print(f"⚠️  Storage API export failed, falling back to pandas: {e}")
+        return False
+
+
 def export_data_to_csv():
     """Export data to CSV files for further analysis."""
     if not bq_client.client:
         print("❌ BigQuery client not available")
         return
-    
+
     try:
         import pandas as pd
-        
+
         # Export leads data
         query = f"""
         SELECT 
@@ -147,8 +267,10 @@ def export_data_to_csv():
         ORDER BY created_at DESC
         """
         
-        df_leads = pd.read_gbq(query, project_id=bq_client.project_id)
-        df_leads.to_csv('leads_export.csv', index=False)
+        if not _stream_query_to_csv(query, 'leads_export.csv'):
+            df_leads = pd.read_gbq(query, project_id=bq_client.project_id,
+                                   credentials=bq_client._creds)
+            df_leads.to_csv('leads_export.csv', index=False)
         print("✅ Exported leads data to leads_export.csv")
         
         # Export email events
@@ -164,8 +286,10 @@ def export_data_to_csv():
         ORDER BY timestamp DESC
         """
         
-        df_events = pd.read_gbq(query, project_id=bq_client.project_id)
-        df_events.to_csv('email_events_export.csv', index=False)
+        if not _stream_query_to_csv(query, 'email_events_export.csv'):
+            df_events = pd.read_gbq(query, project_id=bq_client.project_id,
+                                    credentials=bq_client._creds)
+            df_events.to_csv('email_events_export.csv', index=False)
         print("✅ Exported email events to email_events_export.csv")
         
     except ImportError:
@@ -7,6 +7,7 @@ Run this script to set up your environment and validate configuration.
 import os
 import sys
 import subprocess
+from collections import defaultdict
 from pathlib import Path
 
 
@@ -21,12 +22,24 @@ def check_python_version():
 def install_dependencies():
     """Install required dependencies."""
     print("📦 Installing dependencies...")
+    base_cmd = [
+        sys.executable, "-m", "pip", "install",
+        "--disable-pip-version-check", "--no-input",
+        "-r", "requirements.txt",
+    ]
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        # Wheels only: skips sdist builds entirely on the happy path
+        subprocess.check_call(base_cmd + ["--only-binary=:all:"])
         print("✅ Dependencies installed successfully")
     except subprocess.CalledProcessError:
-        print("❌ Failed to install dependencies")
-        sys.exit(1)
+        # Some platform lacks a wheel; retry allowing source builds
+        print("⚠️  Wheel-only install failed, retrying with source builds allowed...")
+        try:
+            subprocess.check_call(base_cmd + ["--prefer-binary"])
+            print("✅ Dependencies installed successfully")
+        except subprocess.CalledProcessError:
+            print("❌ Failed to install dependencies")
+            sys.exit(1)
 
 
 def setup_environment():
@@ -65,11 +78,23 @@ def validate_structure():
         "database/lead_status.json"
     ]
     
-    missing_files = []
+    # One scandir per directory instead of one stat syscall per file
+    needed_by_dir = defaultdict(set)
     for file_path in required_files:
-        if not Path(file_path).exists():
-            missing_files.append(file_path)
-    
+        directory, _, name = file_path.rpartition("/")
+        needed_by_dir[directory or "."].add(name)
+
+    missing_files = []
+    for directory, names in needed_by_dir.items():
+        try:
+            with os.scandir(directory) as entries:
+                present = {entry.name for entry in entries}
+        except FileNotFoundError:
+            present = set()
+        for name in sorted(names - present):
+            missing_files.append(name if directory == "." else f"{directory}/{name}")
+
+
     if missing_files:
         print("❌ Missing required files:")
         for file_path in missing_files:
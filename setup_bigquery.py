@@ -23,7 +23,8 @@ def check_bigquery_setup():
         print(f"✅ Location: {config.bigquery_location}")
         
         # Test BigQuery connection
-        from utils.bigquery_client import bq_client
+        from utils.bigquery_client import get_bq_client
+        bq_client = get_bq_client()
         
         if bq_client.client:
             print("✅ BigQuery client initialized successfully")
@@ -5,11 +5,21 @@ Quick test script to validate Google API credentials and configuration.
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add the project root to Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
+
+def _credentials_file_ok(path: str) -> bool:
+    """EAFP probe: one stat, no exists()-then-open race."""
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+
 try:
     from config import config
     from utils.google_api_clients import get_gmail_service, get_sheets_service
@@ -22,39 +32,49 @@ try:
     print(f"  ✅ Google API Key: {'✓ Present' if config.google_api_key else '❌ Missing'}")
     print(f"  ✅ Sheet ID: {'✓ Present' if config.google_sheet_id else '❌ Missing'}")
     print(f"  ✅ Sender Email: {'✓ Present' if config.sender_email else '❌ Missing'}")
-    print(f"  ✅ Credentials File: {'✓ Present' if os.path.exists(config.google_credentials_path) else '❌ Missing'}")
+    print(f"  ✅ Credentials File: {'✓ Present' if _credentials_file_ok(config.google_credentials_path) else '❌ Missing'}")
     
     # Test Google Services
     print("\n🔌 API Connection Test:")
-    
-    # Test Gmail API
-    print("  📧 Testing Gmail API...")
-    gmail_service = get_gmail_service()
-    if gmail_service:
-        try:
-            profile = gmail_service.users().getProfile(userId='me').execute()
-            print(f"    ✅ Gmail API: Connected as {profile.get('emailAddress')}")
-        except Exception as e:
-            print(f"    ❌ Gmail API Error: {e}")
-    else:
-        print("    ❌ Gmail API: Failed to initialize")
-    
-    # Test Sheets API
-    print("  📊 Testing Sheets API...")
-    sheets_service = get_sheets_service()
-    if sheets_service:
-        try:
-            # Try to access the configured sheet
-            result = sheets_service.spreadsheets().get(
-                spreadsheetId=config.google_sheet_id
-            ).execute()
-            print(f"    ✅ Sheets API: Connected to '{result.get('properties', {}).get('title', 'Unknown')}'")
-        except Exception as e:
-            print(f"    ⚠️  Sheets API: Service OK, but sheet access failed: {e}")
-            print(f"      Check Sheet ID and sharing permissions")
-    else:
-        print("    ❌ Sheets API: Failed to initialize")
-    
+
+    def _probe_gmail():
+        lines = ["  📧 Testing Gmail API..."]
+        gmail_service = get_gmail_service()
+        if gmail_service:
+            try:
+                profile = gmail_service.users().getProfile(userId='me').execute()
+                lines.append(f"    ✅ Gmail API: Connected as {profile.get('emailAddress')}")
+            except Exception as e:
+                lines.append(f"    ❌ Gmail API Error: {e}")
+        else:
+            lines.append("    ❌ Gmail API: Failed to initialize")
+        return lines
+
+    def _probe_sheets():
+        lines = ["  📊 Testing Sheets API..."]
+        sheets_service = get_sheets_service()
+        if sheets_service:
+            try:
+                # Try to access the configured sheet
+                result = sheets_service.spreadsheets().get(
+                    spreadsheetId=config.google_sheet_id
+                ).execute()
+                lines.append(f"    ✅ Sheets API: Connected to '{result.get('properties', {}).get('title', 'Unknown')}'")
+            except Exception as e:
+                lines.append(f"    ⚠️  Sheets API: Service OK, but sheet access failed: {e}")
+                lines.append("      Check Sheet ID and sharing permissions")
+        else:
+            lines.append("    ❌ Sheets API: Failed to initialize")
+        return lines
+
+    # The two probes are independent network round-trips, so run them
+    # concurrently; each thread buffers its output to keep it readable
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for lines in pool.map(lambda probe: probe(), (_probe_gmail, _probe_sheets)):
+            for line in lines:
+                print(line)
+
+
     print("\n" + "=" * 50)
     print("✅ Configuration test completed!")
     print("\n📋 If you see any ❌ errors above:")
@@ -1,15 +1,29 @@
 """Google API client utilities with improved error handling and logging."""
 
-import os
-import pickle
 import logging
+import threading
 from typing import Optional
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from config import config
+from utils.google_auth import get_credentials
+
+try:
+    import httplib2
+    import google_auth_httplib2
+except ImportError:
+    httplib2 = None
+    google_auth_httplib2 = None
+
+# One TCP/TLS connection pool per thread, shared by every service
+# object built in that thread: agents' sub-second API calls stop paying
+# a fresh handshake each, and httplib2's thread-unsafety is contained
+_local = threading.local()
+
+# Built service objects, keyed by (service_name, scopes). Each agent
+# calls these helpers at init, and without the cache each call re-reads
+# the token, re-validates credentials, and re-fetches the discovery doc
+_SERVICE_CACHE = {}
 
 # Define the scopes needed for the application
 SCOPES_GMAIL = [
@@ -19,6 +33,23 @@ SCOPES_GMAIL = [
 SCOPES_SHEETS = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 
 
+def _authorized_http(creds) -> Optional[object]:
+    """
+    Wrap credentials around the shared httplib2 connection pool.
+
+    Returns None when the httplib2 transport is unavailable, in which
+    case callers fall back to per-service credentials (and per-service
+    connections).
+    """
+    if httplib2 is None or google_auth_httplib2 is None:
+        return None
+    http = getattr(_local, 'http', None)
+    if http is None:
+        http = httplib2.Http()
+        _local.http = http
+    return google_auth_httplib2.AuthorizedHttp(creds, http=http)
+
+
 def get_google_api_service(service_name: str, scopes: list) -> Optional[object]:
     """
     Creates and returns a Google API service object.
@@ -31,41 +62,33 @@ def get_google_api_service(service_name: str, scopes: list) -> Optional[object]:
     Returns:
         Google API service object or None if failed
     """
-    creds = None
-    token_filename = f'token_{service_name}.pickle'
+    cache_key = (service_name, tuple(scopes))
+    cached = _SERVICE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
 
     try:
-        # Load existing credentials
-        if os.path.exists(token_filename):
-            with open(token_filename, 'rb') as token:
-                creds = pickle.load(token)
-                logging.debug(f"Loaded existing credentials for {service_name}")
-
-        # Refresh or get new credentials
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                logging.info(f"Refreshing expired credentials for {service_name}")
-                creds.refresh(Request())
-            else:
-                logging.info(f"Starting OAuth flow for {service_name}")
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    config.google_credentials_path, scopes)
-                creds = flow.run_local_server(port=0)
-            
-            # Save the credentials for the next run
-            with open(token_filename, 'wb') as token:
-                pickle.dump(creds, token)
-                logging.info(f"Saved new credentials for {service_name}")
-                
-        # Build the service
+        # Shared credential bootstrap (load/refresh/OAuth flow + caching)
+        creds = get_credentials(scopes, service_name)
+        if creds is None:
+            return None
+
+        # Build the service over the shared HTTP pool when available
+        authed_http = _authorized_http(creds)
         if service_name == 'gmail':
-            service = build('gmail', 'v1', credentials=creds)
+            version = 'v1'
         elif service_name == 'sheets':
-            service = build('sheets', 'v4', credentials=creds)
+            version = 'v4'
         else:
             raise ValueError(f"Unsupported service name: {service_name}")
+
+        if authed_http is not None:
+            service = build(service_name, version, http=authed_http)
+        else:
+            service = build(service_name, version, credentials=creds)
         
         logging.info(f"Successfully created {service_name} service")
+        _SERVICE_CACHE[cache_key] = service
         return service
         
     except FileNotFoundError as e:
@@ -0,0 +1,71 @@
+"""Shared OAuth2 credential bootstrap for all Google services."""
+
+import json
+import logging
+import os
+from typing import List, Optional
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+from config import config
+
+# Credentials keyed by (token_name, scopes): each OAuth'd consumer
+# (Gmail, Sheets, BigQuery) pays the token load/refresh once per process
+_CRED_CACHE = {}
+
+
+def get_credentials(scopes: List[str], token_name: str) -> Optional[Credentials]:
+    """
+    Load, refresh, or mint OAuth2 user credentials.
+
+    Args:
+        scopes: OAuth2 scopes to request
+        token_name: Basename for the token file (token_{token_name}.json)
+
+    Returns:
+        Valid Credentials object, or None if the bootstrap failed
+    """
+    cache_key = (token_name, tuple(scopes))
+    cached = _CRED_CACHE.get(cache_key)
+    if cached is not None and cached.valid:
+        return cached
+
+    creds = None
+    token_filename = f'token_{token_name}.json'
+
+    try:
+        # Load existing credentials from the JSON token blob
+        if os.path.exists(token_filename):
+            with open(token_filename, 'r') as token:
+                creds = Credentials.from_authorized_user_info(
+                    json.load(token), scopes
+                )
+                logging.debug(f"Loaded existing credentials for {token_name}")
+
+        # Refresh or get new credentials
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                logging.info(f"Refreshing expired credentials for {token_name}")
+                creds.refresh(Request())
+            else:
+                logging.info(f"Starting OAuth flow for {token_name}")
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    config.google_credentials_path, scopes)
+                creds = flow.run_local_server(port=0)
+
+            # Save the credentials for the next run
+            with open(token_filename, 'w') as token:
+                token.write(creds.to_json())
+                logging.info(f"Saved new credentials for {token_name}")
+
+        _CRED_CACHE[cache_key] = creds
+        return creds
+
+    except FileNotFoundError as e:
+        logging.error(f"Credentials file not found: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Unexpected error obtaining credentials for {token_name}: {e}")
+        return None